@@ -33,8 +33,10 @@ Copyright (C)  2021 Rage Uday Kiran
      You should have received a copy of the GNU General Public License
      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import io
 import sys
-import statistics
+from collections import Counter
+from itertools import chain
 import pandas as pd
 import validators
 import numpy as np
@@ -113,9 +115,14 @@ class TransactionalDatabase:
         """
         self.inputFile = inputFile
         self.lengthList = []
+        self._lengthArray = np.array([], dtype=np.int32)
+        self._stats = {}
         self.sep = sep
-        self.database = {}
-        self.itemFrequencies = {}
+        self.database = []
+        self._id2item = []
+        self.itemFrequencies = None
+        self._frequencyOrder = []
+        self._distinctItems = None
 
     def run(self) -> None:
         self.readDatabase()
@@ -125,38 +132,70 @@ class TransactionalDatabase:
         read database from input file and store into database and size of each transaction.
         """
         # self.creatingItemSets()
-        numberOfTransaction = 0
+        self.database = []
+        sep = self.sep
+        itemIds = {}
+        setdefault = itemIds.setdefault
         if isinstance(self.inputFile, pd.DataFrame):
             if self.inputFile.empty:
                 print("its empty..")
-            i = self.inputFile.columns.values.tolist()
-            if 'tid' in i and 'Transactions' in i:
-                self.database = self.inputFile.set_index('tid').T.to_dict(orient='records')[0]
-            if 'tid' in i and 'Patterns' in i:
-                self.database = self.inputFile.set_index('tid').T.to_dict(orient='records')[0]
+            columns = set(self.inputFile.columns)
+            if {'tid', 'Transactions'} <= columns:
+                self.database = [[setdefault(item, len(itemIds)) for item in transaction]
+                                 for transaction in self.inputFile['Transactions']]
+            elif {'tid', 'Patterns'} <= columns:
+                self.database = [[setdefault(item, len(itemIds)) for item in transaction]
+                                 for transaction in self.inputFile['Patterns']]
         if isinstance(self.inputFile, str):
             if validators.url(self.inputFile):
-                data = urlopen(self.inputFile)
-                for line in data:
-                    numberOfTransaction += 1
-                    line.strip()
-                    line = line.decode("utf-8")
-                    temp = [i.rstrip() for i in line.split(self.sep)]
-                    temp = [x for x in temp if x]
-                    self.database[numberOfTransaction] = temp
+                with io.TextIOWrapper(urlopen(self.inputFile), encoding='utf-8') as f:
+                    lines = f.readlines()
             else:
                 try:
                     with open(self.inputFile, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            numberOfTransaction += 1
-                            line.strip()
-                            temp = [i.rstrip() for i in line.split(self.sep)]
-                            temp = [x for x in temp if x]
-                            self.database[numberOfTransaction] = temp
+                        lines = f.readlines()
                 except IOError:
                     print("File Not Found")
                     quit()
-        self.lengthList = [len(s) for s in self.database.values()]
+            self.database = [[setdefault(item, len(itemIds)) for item in filter(None, map(str.rstrip, line.split(sep)))]
+                             for line in lines]
+            del lines
+        self._id2item = list(itemIds)
+        self._lengthArray = np.fromiter(map(len, self.database), dtype=np.int32, count=len(self.database))
+        self.lengthList = self._lengthArray.tolist()
+        self.itemFrequencies = None
+        self._frequencyOrder = []
+        self._distinctItems = None
+        self._computeStats()
+
+    def _computeStats(self) -> None:
+        """
+        compute the transaction length statistics once, so that their getters only look them up.
+        """
+        lengths = self._lengthArray
+        self._stats = {}
+        if lengths.size == 0:
+            return
+        mean = lengths.mean()
+        squares = float(np.square(lengths - mean).sum())
+        self._stats['min'] = int(lengths.min())
+        self._stats['max'] = int(lengths.max())
+        self._stats['mean'] = float(mean)
+        self._stats['std'] = (squares / lengths.size) ** 0.5
+        if lengths.size > 1:
+            self._stats['var'] = squares / (lengths.size - 1)
+
+    def _getStat(self, name: str) -> Union[int, float]:
+        """
+        look up a cached transaction length statistic.
+        :param name: name of the statistic
+        :type name: str
+        :return: value of the statistic
+        :rtype: Union[int, float]
+        """
+        if not self._stats:
+            raise ValueError("Transaction length statistics are undefined for an empty database")
+        return self._stats[name]
 
     def getDatabaseSize(self) -> int:
         """
@@ -166,21 +205,13 @@ class TransactionalDatabase:
         """
         return len(self.database)
 
-    def getTotalNumberOfItems(self) -> int:
-        """
-        get the number of items in database.
-        :return: number of items
-        :rtype: int
-        """
-        return len(self.getSortedListOfItemFrequencies())
-
     def getMinimumTransactionLength(self) -> int:
         """
         get the minimum transaction length
         :return: minimum transaction length
         :rtype: int
         """
-        return min(self.lengthList)
+        return self._getStat('min')
 
     def getAverageTransactionLength(self) -> float:
         """
@@ -188,8 +219,7 @@ class TransactionalDatabase:
         :return: average transaction length
         :rtype: float
         """
-        totalLength = sum(self.lengthList)
-        return totalLength / len(self.database)
+        return self._getStat('mean')
 
     def getMaximumTransactionLength(self) -> int:
         """
@@ -197,7 +227,7 @@ class TransactionalDatabase:
         :return: maximum transaction length
         :rtype: int
         """
-        return max(self.lengthList)
+        return self._getStat('max')
 
     def getStandardDeviationTransactionLength(self) -> float:
         """
@@ -205,15 +235,17 @@ class TransactionalDatabase:
         :return: standard deviation transaction length
         :rtype: float
         """
-        return statistics.pstdev(self.lengthList)
+        return self._getStat('std')
 
     def getVarianceTransactionLength(self) -> float:
         """
-        get the variance transaction length
+        get the sample variance transaction length. it needs at least two transactions.
         :return: variance transaction length
         :rtype: float
         """
-        return statistics.variance(self.lengthList)
+        if self.getDatabaseSize() < 2:
+            raise ValueError("Variance of transaction lengths requires at least two transactions")
+        return self._getStat('var')
 
     def getNumberOfItems(self) -> int:
         """
@@ -221,28 +253,25 @@ class TransactionalDatabase:
         :return: number of items
         :rtype: int
         """
-        return len(self.getSortedListOfItemFrequencies())
+        return len(self._id2item)
+
+    getTotalNumberOfItems = getNumberOfItems
 
     def convertDataIntoMatrix(self) -> np.ndarray:
-        singleItems = self.getSortedListOfItemFrequencies()
-        # big_array = np.zeros((self.getDatabaseSize(), len(self.getSortedListOfItemFrequencies())))
-        itemsets = {}
-        for i in self.database:
-            for item in singleItems:
-                if item in itemsets:
-                    if item in self.database[i]:
-                        itemsets[item].append(1)
-                    else:
-                        itemsets[item].append(0)
-                else:
-                    if item in self.database[i]:
-                        itemsets[item] = [1]
-                    else:
-                        itemsets[item] = [0]
-        # new = pd.DataFrame.from_dict(itemsets)
-        data = list(itemsets.values())
-        an_array = np.array(data)
-        return an_array
+        """
+        convert the database into a binary matrix with one row per transaction and one column per item.
+        rows follow the order of transactions in the database and columns follow the order of getSortedListOfItemFrequencies().
+        :return: database matrix
+        :rtype: np.ndarray
+        """
+        self.getSortedListOfItemFrequencies()
+        columns = np.empty(len(self._id2item), dtype=np.int64)
+        columns[self._frequencyOrder] = np.arange(len(self._id2item))
+        indices = np.fromiter(chain.from_iterable(self.database), dtype=np.int64, count=int(self._lengthArray.sum()))
+        rows = np.repeat(np.arange(self.getDatabaseSize()), self._lengthArray)
+        matrix = np.zeros((self.getDatabaseSize(), len(self._id2item)), dtype=np.uint8)
+        matrix[rows, columns[indices]] = 1
+        return matrix
 
     def getSparsity(self) -> float:
         """
@@ -250,45 +279,47 @@ class TransactionalDatabase:
         :return: database sparsity
         :rtype: float
         """
-        big_array = self.convertDataIntoMatrix()
-        n_zeros = np.count_nonzero(big_array == 0)
-        return (n_zeros / big_array.size)
+        return 1.0 - self.getDensity()
 
     def getDensity(self) -> float:
         """
-        get the sparsity of database. sparsity is percentage of 0 of database.
-        :return: database sparsity
+        get the density of database. density is percentage of non-zero cells in the transaction-by-item matrix of database.
+        :return: database density
         :rtype: float
         """
-        big_array = self.convertDataIntoMatrix()
-        n_zeros = np.count_nonzero(big_array != 0)
-        return (n_zeros / big_array.size)
+        if self._distinctItems is None:
+            self._distinctItems = sum(map(len, map(set, self.database)))
+        return self._distinctItems / (self.getDatabaseSize() * len(self._id2item))
 
     def getSortedListOfItemFrequencies(self) -> dict:
         """
-        get sorted list of item frequencies
+        get sorted list of item frequencies. the returned dictionary is cached until the database is read again, so callers must not modify it.
         :return: item frequencies
         :rtype: dict
         """
-        itemFrequencies = {}
-        for tid in self.database:
-            for item in self.database[tid]:
-                itemFrequencies[item] = itemFrequencies.get(item, 0)
-                itemFrequencies[item] += 1
-        self.itemFrequencies = {k: v for k, v in sorted(itemFrequencies.items(), key=lambda x: x[1], reverse=True)}
+        if self.itemFrequencies is not None:
+            return self.itemFrequencies
+        itemFrequencies = Counter(chain.from_iterable(self.database)).most_common()
+        self._frequencyOrder = [item for item, _ in itemFrequencies]
+        self.itemFrequencies = {self._id2item[item]: count for item, count in itemFrequencies}
         return self.itemFrequencies
     
-    def getFrequenciesInRange(self) -> dict:
+    def getFrequenciesInRange(self) -> List[Tuple[int, int, int]]:
+        """
+        get the number of items whose frequency falls in each of up to six equal-width integer ranges, starting at 1 and covering the maximum frequency.
+        every range includes its lower bound and excludes its upper bound.
+        :return: list of (lower bound, upper bound, number of items) triples
+        :rtype: list
+        """
         fre = self.getSortedListOfItemFrequencies()
-        rangeFrequencies = {}
-        maximum = max([i for i in fre.values()])
-        values = [int(i*maximum/6) for i in range(1,6)]
-        va = len({key: val for key, val in fre.items() if val > 0 and val < values[0]})
-        rangeFrequencies[va] = values[0]
-        for i in range(1,len(values)):
-            va = len({key: val for key, val in fre.items() if val < values[i] and val > values[i-1]})
-            rangeFrequencies[va] = values[i]
-        return rangeFrequencies
+        if not fre:
+            raise ValueError("Cannot compute frequency ranges of an empty database")
+        counts = np.fromiter(fre.values(), dtype=np.int64, count=len(fre))
+        maximum = int(counts.max())
+        width = -(-maximum // 6)
+        edges = np.arange(1, maximum + width + 1, width)
+        hist, _ = np.histogram(counts, bins=edges)
+        return list(zip(edges[:-1].tolist(), edges[1:].tolist(), hist.tolist()))
 
     def getTransanctionalLengthDistribution(self) -> dict:
         """
@@ -296,11 +327,8 @@ class TransactionalDatabase:
         :return: a dictionary with transaction length as keys and their total length as values
         :rtype: dict
         """
-        transactionLength = {}
-        for length in self.lengthList:
-            transactionLength[length] = transactionLength.get(length, 0)
-            transactionLength[length] += 1
-        return {k: v for k, v in sorted(transactionLength.items(), key=lambda x: x[0])}
+        counts = np.bincount(self._lengthArray)
+        return {int(length): int(counts[length]) for length in np.flatnonzero(counts)}
 
     def save(self, data: dict, outputFile: str) -> None:
         """
@@ -312,8 +340,7 @@ class TransactionalDatabase:
         :return: None
         """
         with open(outputFile, 'w') as f:
-            for key, value in data.items():
-                f.write(f'{key}\t{value}\n')
+            f.write(''.join([f'{key}\t{value}\n' for key, value in data.items()]))
                    
     def printStats(self) -> None:
         print(f'Database size (total no of transactions) : {self.getDatabaseSize()}')
@@ -328,7 +355,7 @@ class TransactionalDatabase:
     def plotGraphs(self) -> None:
         # itemFrequencies = self.getFrequenciesInRange()
         transactionLength = self.getTransanctionalLengthDistribution()
-        plt.plotLineGraphFromDictionary(self.itemFrequencies, 100, 0, 'Frequency', 'No of items', 'frequency')
+        plt.plotLineGraphFromDictionary(self.getSortedListOfItemFrequencies(), 100, 0, 'Frequency', 'No of items', 'frequency')
         plt.plotLineGraphFromDictionary(transactionLength, 100, 0, 'transaction length', 'transaction length', 'frequency')
 
 